@@ -0,0 +1,215 @@
+import os
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+import re
+import orjson
+from datetime import datetime, timezone as _dt_tz
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+from dateutil.parser import parse as date_parse
+import ciso8601
+
+# Shared scheduling logic — config, Cal.com transport, timezone and
+# availability helpers. main.py only registers the Flask routes.
+
+# Load environment variables
+load_dotenv()
+
+# 📝 Logging — records are queued and written by a background listener so
+# request handlers never block on stream I/O
+logger = logging.getLogger("scheduler")
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+logger.propagate = False
+_log_queue = queue.SimpleQueue()
+logger.addHandler(QueueHandler(_log_queue))
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+_log_listener = QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+CAL_API_KEY = os.getenv("CAL_API_KEY")
+CAL_EVENT_TYPE_ID = os.getenv("CAL_EVENT_TYPE_ID")
+MCP_SECRET = os.getenv("MCP_SECRET")  # Optional security header
+
+if not CAL_API_KEY:
+    logger.warning("CAL_API_KEY not found in environment variables!")
+if not CAL_EVENT_TYPE_ID:
+    raise RuntimeError("CAL_EVENT_TYPE_ID not found in environment variables!")
+try:
+    CAL_EVENT_TYPE_ID_INT = int(CAL_EVENT_TYPE_ID)
+except ValueError:
+    raise RuntimeError(f"CAL_EVENT_TYPE_ID must be an integer, got: {CAL_EVENT_TYPE_ID}")
+
+CAL_BOOKINGS_URL = "https://api.cal.com/v2/bookings"
+HEADERS = {
+    "Authorization": f"Bearer {CAL_API_KEY}",
+    "Content-Type": "application/json",
+    "cal-api-version": "2024-08-13",
+}
+
+# 🔌 Shared Cal.com session — keeps TLS connections alive between bookings
+SESSION = requests.Session()
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=50,
+        max_retries=Retry(
+            total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504]
+        ),
+    ),
+)
+
+
+# 📡 Cal.com booking call — blocking on purpose: under gevent workers the
+# pooled session is already cooperative, so no event loop is needed here
+def call_cal_com(payload):
+    return SESSION.post(
+        CAL_BOOKINGS_URL,
+        data=orjson.dumps(payload),
+        headers=HEADERS,
+        timeout=(3, 10),
+    )
+
+
+_UTC = _dt_tz.utc
+
+_WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+_HOURS = tuple(f"{h}:00" for h in range(24))
+
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_MAX_TIME_LEN = 256
+
+
+# 🌍 Timezone lookup — ZoneInfo interns its instances per key, so lookups
+# need no extra cache. Raises ZoneInfoNotFoundError or ValueError.
+def get_tz(name):
+    return ZoneInfo(name)
+
+
+# 🕒 Parses a user time string; naive results are placed in ``tz``.
+# Aware inputs are left as-is: is_available_slot converts them itself.
+def parse_user_datetime(time_str, tz):
+    # ISO-8601 strings take the C fast path; natural language falls back to dateutil
+    try:
+        parsed_date = ciso8601.parse_datetime(time_str)
+    except ValueError:
+        parsed_date = date_parse(time_str, fuzzy=True)
+
+    if parsed_date.tzinfo is None:
+        parsed_date = parsed_date.replace(tzinfo=tz)
+    return parsed_date
+
+
+# 🧠 Availability checker — decisions are fixed per wall-clock minute, so
+# they are memoized on (epoch minute, timezone)
+def is_available_slot(dt, timezone="UTC"):
+    return _availability_for_minute(int(dt.timestamp() // 60), timezone)
+
+
+@lru_cache(maxsize=4096)
+def _availability_for_minute(ts_minute, timezone):
+    local_dt = datetime.fromtimestamp(ts_minute * 60, tz=get_tz(timezone))
+
+    weekday = local_dt.weekday()  # 0=Monday, 6=Sunday
+    hour = local_dt.hour
+
+    if weekday >= 5:
+        return False, f"Not available on {_WEEKDAYS[weekday]}"
+    if hour < 9 or hour >= 17:
+        return False, f"Outside business hours (9 AM - 5 PM). Requested: {_HOURS[hour]}"
+
+    return True, "Available"
+
+
+# 🧾 Validates one booking request and builds its Cal.com payload.
+# Returns (payload, iso_date, None) or (None, None, (error_body, status)).
+def prepare_booking(data):
+    name = data.get("name")
+    email = data.get("email")
+    time_str = data.get("time")
+    duration = data.get("duration", 30)
+    user_timezone = data.get("timezone", "Europe/Amsterdam")
+
+    if not name or not email or not time_str:
+        return None, None, ({"error": "Missing required fields: name, email, time"}, 400)
+
+    # Cheap checks first — reject garbage before any date parsing
+    if not _EMAIL_RE.match(email):
+        return None, None, ({"error": f"Invalid email: {email}"}, 400)
+    if len(time_str) > _MAX_TIME_LEN:
+        return None, None, (
+            {"error": f"Time string too long (max {_MAX_TIME_LEN} characters)"},
+            400,
+        )
+
+    # Validate timezone
+    try:
+        tz = get_tz(user_timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None, None, ({"error": f"Invalid timezone: {user_timezone}"}, 400)
+
+    # Parse date/time in the user's timezone
+    try:
+        parsed_date = parse_user_datetime(time_str, tz)
+    except Exception as e:
+        return None, None, (
+            {"error": f"Could not parse date: {time_str}", "details": str(e)},
+            400,
+        )
+
+    # Validate slot availability
+    is_avail, avail_msg = is_available_slot(parsed_date, user_timezone)
+    if not is_avail:
+        return None, None, (
+            {
+                "error": "Requested time is not available",
+                "reason": avail_msg,
+                "availability": "Monday-Friday, 9:00 AM - 5:00 PM in your timezone",
+            },
+            400,
+        )
+
+    # Convert to UTC for Cal.com API
+    iso_date = parsed_date.astimezone(_UTC).isoformat()
+
+    payload = {
+        "start": iso_date,
+        "eventTypeId": CAL_EVENT_TYPE_ID_INT,
+        "attendee": {
+            "name": name,
+            "email": email,
+            "timeZone": user_timezone,
+        },
+    }
+    return payload, iso_date, None
+
+
+# 📅 Creates the booking in Cal.com. Returns (body, status).
+def create_booking(payload, iso_date):
+    res = call_cal_com(payload)
+    booking_data = orjson.loads(res.content)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Cal.com response %s (%s): %s",
+            res.status_code,
+            booking_data.get("status"),
+            booking_data,
+        )
+
+    if res.status_code != 201 or booking_data.get("status") != "success":
+        return {"error": "Failed to create Cal.com booking", "details": booking_data}, 500
+
+    return {
+        "success": True,
+        "message": f"Meeting scheduled for {iso_date}",
+        "booking": booking_data.get("data"),
+    }, 200
@@ -0,0 +1,9 @@
+# Run with: gunicorn wsgi:app
+# Cal.com bookings are I/O-bound, so gevent workers let each process keep
+# many upstream calls in flight on the shared keep-alive session.
+wsgi_app = "wsgi:app"
+worker_class = "gevent"
+workers = 2
+worker_connections = 500
+keepalive = 5
+timeout = 30
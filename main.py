@@ -1,121 +1,128 @@
 from flask import Flask, request, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-import os
-import requests
-from dotenv import load_dotenv
-from dateutil.parser import parse as date_parse
-import pytz
-
-# Load environment variables
-load_dotenv()
+from werkzeug.exceptions import HTTPException
+import orjson
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from core import MCP_SECRET, create_booking, logger, prepare_booking
+
+
+# ⚡ orjson-backed JSON for request.get_json() and jsonify()
+class ORJSONProvider(JSONProvider):
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if isinstance(s, str):
+            s = s.encode()
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 
 CORS(app)
 
-CAL_API_KEY = os.getenv("CAL_API_KEY")
-CAL_EVENT_TYPE_ID = os.getenv("CAL_EVENT_TYPE_ID")
-MCP_SECRET = os.getenv("MCP_SECRET")  # Optional security header
+_MAX_BATCH_SIZE = 50
+_batch_executor = ThreadPoolExecutor(max_workers=16)
 
-if not CAL_API_KEY:
-    print("⚠️  WARNING: CAL_API_KEY not found in environment variables!")
-if not CAL_EVENT_TYPE_ID:
-    print("⚠️  WARNING: CAL_EVENT_TYPE_ID not found in environment variables!")
 
+# 📦 Static JSON bodies are serialized once at import time
+def _json_body(body, cacheable=False):
+    res = app.response_class(body, mimetype="application/json")
+    if cacheable:
+        res.headers["Cache-Control"] = "public, max-age=300"
+    return res
 
-# 🧠 Availability checker
-def is_available_slot(dt, timezone="UTC"):
-    tz = pytz.timezone(timezone)
-    local_dt = dt.astimezone(tz)
 
-    weekday = local_dt.weekday()  # 0=Monday, 6=Sunday
-    hour = local_dt.hour
+_INVALID_JSON_BODY = orjson.dumps({"error": "Request body must be a JSON object"})
 
-    if weekday >= 5:
-        return False, f"Not available on {local_dt.strftime('%A')}"
-    if hour < 9 or hour >= 17:
-        return False, f"Outside business hours (9 AM - 5 PM). Requested: {hour}:00"
 
-    return True, "Available"
+# 🧩 Root endpoint — defines MCP tools available
+_MCP_ROOT_BODY = orjson.dumps(
+    {
+        "mcp": "1.0",
+        "tools": [
+            {
+                "name": "schedule_meeting",
+                "description": "Schedules a meeting in Cal.com using a name, email, and natural language date.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "name": {
+                            "type": "string",
+                            "description": "Full name of attendee",
+                        },
+                        "email": {
+                            "type": "string",
+                            "description": "Email of attendee",
+                        },
+                        "time": {
+                            "type": "string",
+                            "description": "Natural language time (e.g., 'next Monday at 3pm')",
+                        },
+                        "duration": {
+                            "type": "integer",
+                            "description": "Meeting duration in minutes",
+                            "default": 30,
+                        },
+                        "timezone": {
+                            "type": "string",
+                            "description": "Timezone (e.g., 'Europe/Amsterdam', 'Europe/Kyiv', 'America/New_York'). MUST match your Cal.com account timezone setting.",
+                            "default": "Europe/Amsterdam",
+                        },
+                    },
+                    "required": ["name", "email", "time"],
+                },
+            }
+        ],
+    }
+)
 
 
-# 🧩 Root endpoint — defines MCP tools available
 @app.route("/", methods=["GET"])
 def mcp_root():
-    return jsonify(
-        {
-            "mcp": "1.0",
-            "tools": [
-                {
-                    "name": "schedule_meeting",
-                    "description": "Schedules a meeting in Cal.com using a name, email, and natural language date.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "name": {
-                                "type": "string",
-                                "description": "Full name of attendee",
-                            },
-                            "email": {
-                                "type": "string",
-                                "description": "Email of attendee",
-                            },
-                            "time": {
-                                "type": "string",
-                                "description": "Natural language time (e.g., 'next Monday at 3pm')",
-                            },
-                            "duration": {
-                                "type": "integer",
-                                "description": "Meeting duration in minutes",
-                                "default": 30,
-                            },
-                            "timezone": {
-                                "type": "string",
-                                "description": "Timezone (e.g., 'Europe/Amsterdam', 'Europe/Kyiv', 'America/New_York'). MUST match your Cal.com account timezone setting.",
-                                "default": "Europe/Amsterdam",
-                            },
+    return _json_body(_MCP_ROOT_BODY, cacheable=True)
+
+
+_TOOLS_BODY = orjson.dumps(
+    {
+        "tools": [
+            {
+                "name": "schedule_meeting",
+                "description": "Schedules a call on Cal.com given a name, email, and time string.",
+                "input_schema": {
+                    "type": "object",
+                    "properties": {
+                        "name": {
+                            "type": "string",
+                            "description": "Full name of the attendee",
+                        },
+                        "email": {
+                            "type": "string",
+                            "description": "Email address of the attendee",
+                        },
+                        "time": {
+                            "type": "string",
+                            "description": "Natural language date/time (e.g. 'next Monday at 3pm')",
+                        },
+                        "timezone": {
+                            "type": "string",
+                            "description": "Timezone (e.g., 'Europe/Kyiv', 'America/New_York')",
                         },
-                        "required": ["name", "email", "time"],
                     },
-                }
-            ],
-        }
-    )
+                    "required": ["name", "email", "time"],
+                },
+            }
+        ]
+    }
+)
 
 
 @app.route("/tools", methods=["GET"])
 def list_tools():
-    return jsonify(
-        {
-            "tools": [
-                {
-                    "name": "schedule_meeting",
-                    "description": "Schedules a call on Cal.com given a name, email, and time string.",
-                    "input_schema": {
-                        "type": "object",
-                        "properties": {
-                            "name": {
-                                "type": "string",
-                                "description": "Full name of the attendee",
-                            },
-                            "email": {
-                                "type": "string",
-                                "description": "Email address of the attendee",
-                            },
-                            "time": {
-                                "type": "string",
-                                "description": "Natural language date/time (e.g. 'next Monday at 3pm')",
-                            },
-                            "timezone": {
-                                "type": "string",
-                                "description": "Timezone (e.g., 'Europe/Kyiv', 'America/New_York')",
-                            },
-                        },
-                        "required": ["name", "email", "time"],
-                    },
-                }
-            ]
-        }
-    )
+    return _json_body(_TOOLS_BODY, cacheable=True)
 
 
 # 🧩 MCP Tool Endpoint
@@ -125,101 +132,94 @@ def schedule_meeting_tool():
     # if MCP_SECRET and request.headers.get("X-MCP-SECRET") != MCP_SECRET:
     #     return jsonify({"error": "Unauthorized"}), 401
 
-    try:
-        data = request.get_json()
-        name = data.get("name")
-        email = data.get("email")
-        time_str = data.get("time")
-        duration = data.get("duration", 30)
-        user_timezone = data.get("timezone", "Europe/Amsterdam")
-
-        if not name or not email or not time_str:
-            return jsonify({"error": "Missing required fields: name, email, time"}), 400
-
-        # Validate timezone
-        try:
-            tz = pytz.timezone(user_timezone)
-        except pytz.exceptions.UnknownTimeZoneError:
-            return jsonify({"error": f"Invalid timezone: {user_timezone}"}), 400
-
-        # Parse date/time in the user's timezone
-        try:
-            parsed_date = date_parse(time_str, fuzzy=True)
-            
-            # If no timezone info, assume it's in the user's timezone
-            if parsed_date.tzinfo is None:
-                parsed_date = tz.localize(parsed_date)
-            else:
-                # Convert to user's timezone for consistency
-                parsed_date = parsed_date.astimezone(tz)
-                
-        except Exception as e:
-            return jsonify({"error": f"Could not parse date: {time_str}", "details": str(e)}), 400
-
-        # Validate slot availability
-        is_avail, avail_msg = is_available_slot(parsed_date, user_timezone)
-        if not is_avail:
-            return jsonify(
-                {
-                    "error": "Requested time is not available",
-                    "reason": avail_msg,
-                    "availability": "Monday-Friday, 9:00 AM - 5:00 PM in your timezone",
-                }
-            ), 400
-
-        # Convert to UTC for Cal.com API
-        iso_date = parsed_date.astimezone(pytz.UTC).isoformat()
-
-        # Call Cal.com API
-        payload = {
-            "start": iso_date,
-            "eventTypeId": int(CAL_EVENT_TYPE_ID),
-            "attendee": {
-                "name": name,
-                "email": email,
-                "timeZone": user_timezone,
-            },
-        }
-
-        headers = {
-            "Authorization": f"Bearer {CAL_API_KEY}",
-            "Content-Type": "application/json",
-            "cal-api-version": "2024-08-13",
-        }
-
-        res = requests.post(
-            "https://api.cal.com/v2/bookings", json=payload, headers=headers
-        )
-        booking_data = res.json()
-
-        print("***********", booking_data)
-        print("################", booking_data.get("status"))
-        print("##&&&&&&&&&&&&&&#", booking_data.get("status") == "success")
-        print(f"Response Status Code: {res.status_code}")
-        print(f"Response Status: {booking_data.get('status')}")
-
-        if res.status_code != 201 or booking_data.get("status") != "success":
-            return jsonify(
-                {"error": "Failed to create Cal.com booking", "details": booking_data}
-            ), 500
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return _json_body(_INVALID_JSON_BODY), 400
+
+    payload, iso_date, error = prepare_booking(data)
+    if error:
+        body, status = error
+        return jsonify(body), status
+
+    body, status = create_booking(payload, iso_date)
+    return _json_body(orjson.dumps(body)), status
 
-        return jsonify(
-            {
-                "success": True,
-                "message": f"Meeting scheduled for {iso_date}",
-                "booking": booking_data.get("data"),
-            }
-        )
 
+def _create_booking_safely(index, payload, iso_date):
+    try:
+        body, status = create_booking(payload, iso_date)
     except Exception as e:
-        print("❌ Exception:", str(e))
-        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+        logger.exception("Failed to schedule meeting #%s", index)
+        body, status = {"error": "Internal Server Error", "details": str(e)}, 500
+    return {"index": index, "status_code": status, **body}
+
+
+# 🧩 Batch MCP Tool Endpoint — validates every booking upfront, then calls
+# Cal.com concurrently and streams each result as soon as it completes
+@app.route("/tools/schedule_meetings", methods=["POST"])
+def schedule_meetings_tool():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return _json_body(_INVALID_JSON_BODY), 400
+
+    bookings = data.get("bookings")
+    if not isinstance(bookings, list) or not bookings:
+        return jsonify({"error": "Missing required field: bookings (non-empty list)"}), 400
+    if len(bookings) > _MAX_BATCH_SIZE:
+        return jsonify(
+            {"error": f"Too many bookings (max {_MAX_BATCH_SIZE} per batch)"}
+        ), 400
+
+    ready = []
+    rejected = []
+    for index, item in enumerate(bookings):
+        if not isinstance(item, dict):
+            rejected.append(
+                {"index": index, "status_code": 400, "error": "Booking must be an object"}
+            )
+            continue
+        payload, iso_date, error = prepare_booking(item)
+        if error:
+            body, status = error
+            rejected.append({"index": index, "status_code": status, **body})
+        else:
+            ready.append((index, payload, iso_date))
+
+    futures = [
+        _batch_executor.submit(_create_booking_safely, index, payload, iso_date)
+        for index, payload, iso_date in ready
+    ]
+
+    def stream():
+        yield b"["
+        first = True
+        for result in rejected:
+            yield (b"" if first else b",") + orjson.dumps(result)
+            first = False
+        for future in as_completed(futures):
+            yield (b"" if first else b",") + orjson.dumps(future.result())
+            first = False
+        yield b"]"
+
+    return app.response_class(stream(), mimetype="application/json")
+
+
+# 🚨 Single place for unexpected errors; HTTP errors (404, 400, ...) pass through
+@app.errorhandler(Exception)
+def handle_unexpected_error(e):
+    if isinstance(e, HTTPException):
+        return e
+    logger.error("Unhandled error on %s", request.path, exc_info=e)
+    return jsonify({"error": "Internal Server Error"}), 500
 
 
 # 🔧 Health check (optional)
+_HEALTH_BODY = orjson.dumps({"status": "ok"})
+
+
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "ok"})
+    return _json_body(_HEALTH_BODY)
 
 
 if __name__ == "__main__":
@@ -1,4 +1,8 @@
-from main import app  # Import the Flask app from app.py
+from gevent import monkey
+
+monkey.patch_all()  # Make requests/urllib3 sockets cooperative before they are imported
+
+from main import app  # Import the Flask app from main.py
 
 if __name__ == "__main__":
     app.run()
\ No newline at end of file